@@ -2,6 +2,7 @@ import logging
 from pathlib import Path
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
 
 from phototracks.photo import Photo, PhotoCollection
@@ -10,9 +11,28 @@ from phototracks.track import Track, TrackCollection
 logger = logging.getLogger(__name__)
 
 
+def _nearest(times: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """
+    Return the index of the nearest element of `times` for each of `targets`.
+
+    Args:
+        times: Sorted, non-empty array of times.
+        targets: Times to look up.
+
+    Returns:
+        np.ndarray: Positions in `times` of the nearest time to each target.
+    """
+    if len(times) == 1:
+        return np.zeros(len(targets), dtype=np.intp)
+    right = np.clip(np.searchsorted(times, targets), 1, len(times) - 1)
+    left = right - 1
+    return np.where(targets - times[left] <= times[right] - targets, left, right)
+
+
 def locate_photos(tracks: TrackCollection, photos: PhotoCollection) -> gpd.GeoDataFrame:
     """
     Locate the given photos by matching their timestamps to the tracks.
+    Photos taken outside the time range of every track are discarded.
     Returns a GeoDataFrame with the photos locations.
 
     Args:
@@ -23,24 +43,48 @@ def locate_photos(tracks: TrackCollection, photos: PhotoCollection) -> gpd.GeoDa
         gpd.GeoDataFrame: A GeoDataFrame containing the photos locations.
     """
 
-    df_photos = photos.df_with_time
+    df_photos = photos.df_with_time.sort_values("time")
     df_tracks = tracks.gdf_with_time
 
-    df_photos["time"] = pd.to_datetime(df_photos["time"], utc=True).astype(
-        "datetime64[ms, UTC]"
-    )
-    df_tracks["time"] = pd.to_datetime(df_tracks["time"], utc=True).astype(
-        "datetime64[ms, UTC]"
-    )
+    # Both collections already provide datetime64[ns, UTC] times, only convert
+    # data coming from elsewhere so both time columns share the same unit.
+    if df_photos["time"].dtype != df_tracks["time"].dtype:
+        df_photos["time"] = pd.to_datetime(df_photos["time"], utc=True).astype(
+            df_tracks["time"].dtype
+        )
+
+    photo_times = df_photos["time"].to_numpy(dtype="datetime64[ns]")
+    point_times = df_tracks["time"].to_numpy(dtype="datetime64[ns]")
+
+    # Time range of each track, in start order
+    groups = df_tracks.groupby("track_path").indices.values()
+    starts = np.array([point_times[p].min() for p in groups], dtype="datetime64[ns]")
+    ends = np.array([point_times[p].max() for p in groups], dtype="datetime64[ns]")
+    order = np.argsort(starts)
+    starts, ends = starts[order], ends[order]
+
+    # A photo is inside the union of the track ranges if some track starting
+    # before it ends after it, i.e. the latest end among those tracks is not
+    # earlier than the photo. Overlapping and nested tracks are covered too.
+    started = np.searchsorted(starts, photo_times, side="right")
+    latest_end = np.maximum.accumulate(ends)
+    inside = started > 0
+    inside[inside] = photo_times[inside] <= latest_end[started[inside] - 1]
+
+    # Match each photo to the nearest point in time of any track, like
+    # merge_asof(direction="nearest"), gdf_with_time is sorted by time
+    photo_idx = np.flatnonzero(inside)
+    point_idx = _nearest(point_times, photo_times[photo_idx])
 
-    merged_df = pd.merge_asof(
-        df_photos,
-        df_tracks,
-        on="time",
-        direction="nearest",
+    merged_df = pd.concat(
+        [
+            df_photos.iloc[photo_idx].reset_index(drop=True),
+            df_tracks.iloc[point_idx].drop(columns="time").reset_index(drop=True),
+        ],
+        axis=1,
     )
 
-    return gpd.GeoDataFrame(merged_df, geometry="geometry", crs=tracks.gdf.crs)
+    return gpd.GeoDataFrame(merged_df, geometry="geometry", crs=df_tracks.crs)
 
 
 def save_waypoints(gdf: gpd.GeoDataFrame, path: Path) -> None:
@@ -0,0 +1,177 @@
+import atexit
+import logging
+import os
+import shelve
+import threading
+from pathlib import Path
+from typing import Callable, Generic, Sequence, TypeVar
+
+logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+
+def cache_dir() -> Path:
+    """
+    Return the folder where the persistent caches are stored.
+    It can be set with the PHOTOTRACKS_CACHE_DIR environment variable and
+    defaults to `$XDG_CACHE_HOME/phototracks` (`~/.cache/phototracks`).
+    """
+    if "PHOTOTRACKS_CACHE_DIR" in os.environ:
+        return Path(os.environ["PHOTOTRACKS_CACHE_DIR"])
+    xdg_cache_home = os.environ.get("XDG_CACHE_HOME")
+    base = Path(xdg_cache_home) if xdg_cache_home else Path.home() / ".cache"
+    return base / "phototracks"
+
+
+class FileCache(Generic[T]):
+    """
+    Persistent cache of values computed from files.
+    Entries are keyed by the file path, modification time and size, so a
+    cached value is discarded as soon as the file changes.
+    If the cache cannot be opened the values are just computed every time.
+
+    Args:
+        name: Name of the cache file.
+        version: Format version of the values, bump it whenever the way they
+            are computed changes so the old entries are no longer served.
+    """
+
+    def __init__(self, name: str, version: int = 1):
+        self.name = name
+        self.version = version
+        self._db: shelve.Shelf[T] | None = None
+        self._disabled = False
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def key(self, path: Path) -> str:
+        """
+        Return the cache key of a file.
+
+        Raises:
+            OSError: If the file cannot be stat'ed.
+        """
+        # Paths that already know their stat, e.g. Photo from a directory scan
+        cached_stat = getattr(path, "_cached_stat", None)
+        stat = cached_stat() if cached_stat is not None else os.stat(path)
+        return (
+            f"{self.version}:{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}"
+        )
+
+    def _open(self) -> shelve.Shelf[T] | None:
+        if self._db is None and not self._disabled:
+            try:
+                folder = cache_dir()
+                folder.mkdir(parents=True, exist_ok=True)
+                self._db = shelve.open(str(folder / self.name))
+            except Exception as e:
+                logger.warning("Cannot open cache %s: %s", self.name, str(e))
+                self._disabled = True
+        return self._db
+
+    def _load(self, db: shelve.Shelf[T], key: str) -> T:
+        """
+        Return the cached value of the key.
+        Entries that cannot be unpickled, e.g. truncated or written by another
+        version of a library, are deleted so they are computed again.
+
+        Raises:
+            KeyError: If the key is not cached or its entry is unreadable.
+        """
+        try:
+            return db[key]
+        except KeyError:
+            raise
+        except Exception as e:
+            logger.warning("Cannot read %s from cache %s: %s", key, self.name, str(e))
+            try:
+                del db[key]
+            except Exception:
+                pass
+            raise KeyError(key) from e
+
+    def get(self, path: Path, compute: Callable[[Path], T]) -> T:
+        """
+        Return the cached value for the given file, computing and storing it
+        on a miss.
+
+        Args:
+            path: File the value is derived from.
+            compute: Function computing the value from the file path.
+        """
+        try:
+            key = self.key(path)
+        except OSError:
+            return compute(path)
+
+        with self._lock:
+            db = self._open()
+            if db is not None:
+                try:
+                    return self._load(db, key)
+                except KeyError:
+                    pass
+
+        value = compute(path)
+
+        with self._lock:
+            db = self._open()
+            if db is not None:
+                try:
+                    db[key] = value
+                except Exception as e:
+                    logger.warning("Cannot store %s in cache: %s", path, str(e))
+        return value
+
+    def get_many(
+        self, paths: Sequence[Path], compute: Callable[[list[Path]], list[T]]
+    ) -> list[T]:
+        """
+        Return the cached values for the given files, computing all the misses
+        with a single call so they can be processed in bulk.
+
+        Args:
+            paths: Files the values are derived from.
+            compute: Function computing the values of a list of file paths.
+        """
+        keys: list[str | None] = []
+        for path in paths:
+            try:
+                keys.append(self.key(path))
+            except OSError:
+                keys.append(None)
+
+        values: dict[int, T] = {}
+        with self._lock:
+            db = self._open()
+            if db is not None:
+                for i, key in enumerate(keys):
+                    if key is not None:
+                        try:
+                            values[i] = self._load(db, key)
+                        except KeyError:
+                            pass
+
+        missing = [i for i in range(len(paths)) if i not in values]
+        computed = compute([paths[i] for i in missing]) if missing else []
+
+        with self._lock:
+            db = self._open()
+            for i, value in zip(missing, computed):
+                values[i] = value
+                key = keys[i]
+                if db is not None and key is not None:
+                    try:
+                        db[key] = value
+                    except Exception as e:
+                        logger.warning("Cannot store %s in cache: %s", paths[i], str(e))
+        return [values[i] for i in range(len(paths))]
+
+    def close(self) -> None:
+        """
+        Flush and close the underlying database.
+        """
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
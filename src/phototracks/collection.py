@@ -2,7 +2,7 @@ import logging
 import os
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Generator, Generic, Type, TypeVar
+from typing import Collection, Generator, Generic, KeysView, Type, TypeVar
 
 logger = logging.getLogger(__name__)
 T = TypeVar("T", bound=Path)
@@ -12,7 +12,7 @@ class FileCollection(Generic[T], ABC):
     def __init__(
         self,
         path: Path,
-        filter_extensions: str | list[str] | None = None,
+        filter_extensions: str | Collection[str] | None = None,
         followlinks: bool = False,
     ):
         self.path = path
@@ -21,24 +21,50 @@ class FileCollection(Generic[T], ABC):
                 self.filter_extensions = None
             case str():
                 self.filter_extensions = [filter_extensions]
-            case list():
+            case _:
                 self.filter_extensions = filter_extensions
+        # Lowercased once so the walker only does a set lookup per file
+        self._extensions = (
+            None
+            if self.filter_extensions is None
+            else frozenset(ext.lower() for ext in self.filter_extensions)
+        )
         self.followlinks = followlinks
 
-        self._cache: dict[Path, T | None] = {}
-        self._paths: set[Path] = set()
+        # Files are keyed by their path string, items are only built when
+        # iterated. The scandir entries are kept so their stat can be reused.
+        self._cache: dict[str, T | None] = {}
+        self._entries: dict[str, os.DirEntry[str]] = {}
         self._populate_paths()
 
+    @property
+    def _paths(self) -> KeysView[str]:
+        """
+        Paths of the files in the collection.
+        """
+        return self._entries.keys()
+
     def _populate_paths(self):
         """
-        Populate the _paths set with the paths of the files in the given folder.
+        Populate the _entries dict with the files in the given folder.
         """
-        for root, _, files in os.walk(self.path, followlinks=self.followlinks):
-            for file in files:
-                if self.filter_extensions is None or any(
-                    file.lower().endswith(ext.lower()) for ext in self.filter_extensions
-                ):
-                    self._paths.add(Path(os.path.join(root, file)))
+        extensions = self._extensions
+        stack = [os.fspath(self.path)]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            if self.followlinks or not entry.is_symlink():
+                                stack.append(entry.path)
+                            continue
+                        if extensions is not None:
+                            dot = entry.name.rfind(".")
+                            if dot == -1 or entry.name[dot:].lower() not in extensions:
+                                continue
+                        self._entries[entry.path] = entry
+            except OSError as e:
+                logger.warning("Cannot scan %s: %s", e.filename, e.strerror)
 
     @abstractmethod
     def _get_path_class(self) -> Type[T]:
@@ -51,22 +77,24 @@ class FileCollection(Generic[T], ABC):
         result = ", ".join(map(lambda p: f'"{p}"', self._paths))
         return f"{self.__class__.__name__}({result})"
 
-    def __iter__(self) -> Generator[T, None, None]:
+    def _create(self, path: str) -> T | None:
         """
-        Iterator of files with the given extension in the given folder.
+        Create the item for the given path, or None if it cannot be created.
         """
         path_class = self._get_path_class()
+        try:
+            return path_class(path)
+        except ValueError as e:
+            logger.error("Cannot create %s from %s: %s", path_class, path, str(e))
+            return None
 
+    def __iter__(self) -> Generator[T, None, None]:
+        """
+        Iterator of files with the given extension in the given folder.
+        """
         for path in self._paths:
             if path not in self._cache:
-                try:
-                    self._cache[path] = path_class(path)
-                except ValueError as e:
-                    logger.error(
-                        "Cannot create %s from %s: %s", path_class, path, str(e)
-                    )
-                    self._cache[path] = None
-                    continue
+                self._cache[path] = self._create(path)
             item = self._cache[path]
             if item is not None:
                 yield item
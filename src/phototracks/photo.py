@@ -1,10 +1,18 @@
 import gzip
 import json
 import logging
+import os
+import re
+import shutil
+import subprocess
 from base64 import b64decode, b64encode
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-from functools import cached_property
+from io import BytesIO
+from operator import itemgetter
 from pathlib import Path
+from typing import Any, BinaryIO, Generator
 from zoneinfo import ZoneInfo
 
 import exifread
@@ -12,6 +20,7 @@ import pandas as pd
 from exifread.core.exceptions import ExifNotFound, InvalidExif
 from PIL import Image
 
+from .cache import FileCache
 from .collection import FileCollection
 
 # TODO: Improve timezone handling
@@ -19,43 +28,275 @@ local_timezone = ZoneInfo("Europe/Madrid")
 
 logger = logging.getLogger(__name__)
 
+# "%y%m%d_%H%M" prefix of photo filenames, e.g. "250126_1317_DSC_2312"
+_FILENAME_TIME = re.compile(r"(\d{2})(\d{2})(\d{2})_(\d{2})(\d{2})(?:_|$)", re.ASCII)
+# EXIF "%Y:%m:%d %H:%M:%S" date time values
+_EXIF_TIME = re.compile(r"(\d{4}):(\d{2}):(\d{2}) (\d{2}):(\d{2}):(\d{2})", re.ASCII)
+# "%Y%m%d_%H%M%S" time stored in compressed filenames
+_COMPRESSED_TIME = re.compile(r"(\d{4})(\d{2})(\d{2})_(\d{2})(\d{2})(\d{2})", re.ASCII)
+
+# Formats Pillow cannot decode, thumbnails use their embedded JPEG preview
+RAW_EXTENSIONS = frozenset([".nef", ".raw"])
+
+
+def _parse_time(path: Path) -> datetime | None:
+    """
+    Parse the time of an image file.
+    It will try to get the time from the exif data.
+    If it fails, it will try to get the time from the filename.
+
+    Args:
+        path: Path of the image.
+
+    Returns:
+        datetime: The time of the image or None if it could not be parsed.
+    """
+    with open(path, "rb") as f:
+        try:
+            # Only "Image DateTime" is needed, skip MakerNotes and thumbnails
+            tags = exifread.process_file(
+                f, stop_tag="DateTime", details=False, extract_thumbnail=False
+            )
+            dt = _time_from_exif(str(tags["Image DateTime"]))
+        except (KeyError, ExifNotFound, InvalidExif):
+            dt = None
+    if dt is None:
+        dt = _time_from_filename(path.stem)
+    if dt is None:
+        logger.debug("Could not get time from %s.", path)
+        return None
+    return dt.replace(tzinfo=local_timezone)
+
+
+def _time_from_exif(value: str) -> datetime | None:
+    """
+    Parse an EXIF "%Y:%m:%d %H:%M:%S" timestamp.
+
+    Args:
+        value: EXIF date time value, e.g. "2025:01:26 13:17:05".
+
+    Returns:
+        datetime: The naive timestamp or None if the value is not valid, as
+        the "0000:00:00 00:00:00" some cameras write when the clock is unset.
+    """
+    match = _EXIF_TIME.match(value)
+    if match is None:
+        return None
+    yyyy, mm, dd, hh, mi, ss = map(int, match.groups())
+    try:
+        return datetime(yyyy, mm, dd, hh, mi, ss)
+    except ValueError:
+        return None
+
+
+def _time_from_filename(stem: str) -> datetime | None:
+    """
+    Parse a "%y%m%d_%H%M" timestamp from the start of a filename stem.
+    The fixed-width fields are matched and converted directly, which is much
+    cheaper than going through `datetime.strptime`.
+
+    Args:
+        stem: Filename without extension, e.g. "250126_1317_DSC_2312".
+
+    Returns:
+        datetime: The naive timestamp or None if the stem does not match.
+    """
+    match = _FILENAME_TIME.match(stem)
+    if match is None:
+        return None
+    yy, mm, dd, hh, mi = map(int, match.groups())
+    # Same pivot as strptime's %y: 69-99 -> 19xx, 00-68 -> 20xx
+    year = yy + (1900 if yy >= 69 else 2000)
+    try:
+        return datetime(year, mm, dd, hh, mi)
+    except ValueError:
+        return None
+
+
+# Parsed times persist between runs, keyed by (version, path, mtime, size)
+_time_cache: FileCache[datetime | None] = FileCache("photo_times")
+
+
+# Times already read in this process, by cache key, so every Photo instance
+# of the same unchanged file shares a single parse.
+_times: dict[str, datetime | None] = {}
+
+
+def _time_key(photo: "Photo") -> str | None:
+    """
+    Return the key of the given image in `_times`, or None if it cannot be
+    stat'ed.
+    """
+    try:
+        return _time_cache.key(photo)
+    except OSError:
+        return None
+
+
+def _photo_time(photo: "Photo") -> datetime | None:
+    """
+    Return the time of the given image, memoized until the file changes.
+    """
+    key = _time_key(photo)
+    if key is None:
+        return _parse_time(photo)
+    if key not in _times:
+        _times[key] = _time_cache.get(photo, _parse_time)
+    return _times[key]
+
+
+def _exiftool_times(paths: list[Path]) -> list[datetime | None] | None:
+    """
+    Parse the time of several image files with a single exiftool process.
+    exiftool reads the same IFD0 DateTime tag as `_parse_time` (it names it
+    ModifyDate) and the filename is used as fallback, as in `_parse_time`.
+
+    Args:
+        paths: Paths of the images.
+
+    Returns:
+        list[datetime | None]: The time of each image, or None if exiftool is
+        not installed, could not be run or did not report every image.
+    """
+    exiftool = shutil.which("exiftool")
+    if exiftool is None:
+        return None
+    try:
+        result = subprocess.run(
+            [exiftool, "-json", "-charset", "filename=utf8", "-IFD0:ModifyDate"]
+            + ["-@", "-"],
+            input="\n".join(map(str, paths)),
+            capture_output=True,
+            encoding="utf-8",
+            check=False,
+        )
+        entries = json.loads(result.stdout) if result.stdout.strip() else []
+    except (OSError, ValueError) as e:
+        logger.warning("Cannot read times with exiftool: %s", str(e))
+        return None
+
+    tags = {
+        os.path.normpath(entry["SourceFile"]): entry
+        for entry in entries
+        if isinstance(entry, dict) and "SourceFile" in entry
+    }
+    # A broken exiftool, e.g. a missing Perl module, reports nothing. Its
+    # missing answers must not replace what exifread would read.
+    if any(os.path.normpath(path) not in tags for path in paths):
+        logger.warning(
+            "exiftool (exit status %d) did not report every file: %s",
+            result.returncode,
+            result.stderr.strip(),
+        )
+        return None
+
+    times: list[datetime | None] = []
+    for path in paths:
+        dt_raw = tags[os.path.normpath(path)].get("ModifyDate")
+        dt = _time_from_exif(str(dt_raw)) or _time_from_filename(path.stem)
+        if dt is None:
+            logger.debug("Could not get time from %s.", path)
+        times.append(None if dt is None else dt.replace(tzinfo=local_timezone))
+    return times
+
+
+# Below this many files starting worker processes costs more than parsing
+# them one after the other (~0.1 ms each)
+_PARALLEL_MIN_FILES = 64
+
+
+def _parse_times(paths: list[Path]) -> list[datetime | None]:
+    """
+    Parse the time of several image files.
+    A single exiftool process is used when it is installed, as it is far faster
+    than exifread. Otherwise large batches are parsed in parallel worker
+    processes, since exifread is pure Python and holds the GIL.
+    """
+    times = _exiftool_times(paths)
+    if times is not None:
+        return times
+    if len(paths) >= _PARALLEL_MIN_FILES:
+        # One worker per chunk of 32 files at most
+        workers = min(os.cpu_count() or 1, len(paths) // 32)
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(_parse_time, paths, chunksize=32))
+        except (OSError, NotImplementedError, AssertionError, BrokenProcessPool) as e:
+            # E.g. no /dev/shm or a daemonic parent process
+            logger.warning("Cannot parse times in worker processes: %s", str(e))
+    return [_parse_time(path) for path in paths]
+
+
+def _raw_preview(f: BinaryIO, tags: dict[str, Any]) -> bytes | None:
+    """
+    Return the largest JPEG preview embedded in a TIFF based RAW file.
+    NEFs store it in one of the "Image SubIFDs", other files may only have the
+    IFD1 thumbnail that exifread extracts as "JPEGThumbnail".
+
+    Args:
+        f: The open RAW file, its TIFF header must be at the start.
+        tags: Tags of the file read by exifread.process_file.
+    """
+    best = tags.get("JPEGThumbnail")
+    for name, offset in tags.items():
+        if not (
+            name.startswith("EXIF SubIFD") and name.endswith(" JPEGInterchangeFormat")
+        ):
+            continue
+        length = tags.get(f"{name}Length")
+        if length is None or length.values[0] <= len(best or b""):
+            continue
+        f.seek(offset.values[0])
+        data = f.read(length.values[0])
+        if data.startswith(b"\xff\xd8"):
+            best = data
+    return best
+
 
 class Photo(Path):
-    @cached_property
+    # Directory entry the photo was found with, see `_cached_stat`
+    _entry: os.DirEntry[str] | None = None
+
+    def _cached_stat(self) -> os.stat_result:
+        """
+        Return the stat of the image for the cache key and thumbnail checks.
+        Photos from a PhotoCollection reuse the os.DirEntry of the folder scan,
+        which caches the result, so the file is stat'ed at most once.
+        `Path.stat` is left alone, so `exists()` and friends stay up to date.
+        """
+        if self._entry is not None:
+            return self._entry.stat()
+        return os.stat(self)
+
+    @property
     def time(self) -> datetime | None:
         """
         Return the time of the image.
         It will try to get the time from the exif data.
         If it fails, it will try to get the time from the filename.
+        Parsed times are cached on disk and reused while the file is unchanged.
 
         Returns:
             datetime: The time of the image.
         """
-        with open(self, "rb") as f:
-            try:
-                dt_raw = exifread.process_file(f)["Image DateTime"]
-                dt = datetime.strptime(str(dt_raw), "%Y:%m:%d %H:%M:%S")
-            except (KeyError, ExifNotFound, InvalidExif):
-                dt = datetime.now(local_timezone)
-                try:
-                    basename = self.stem.split("_")
-                    dt_raw = f"{basename[0]}_{basename[1]}"
-                    dt = datetime.strptime(dt_raw, "%y%m%d_%H%M")
-                except (ValueError, IndexError):
-                    logger.debug("Could not get time from %s.", self)
-                    return None
-        return dt.replace(tzinfo=local_timezone)
+        return _photo_time(self)
 
     @property
     def compressed_filename(self) -> str:
         """
         Return the compressed filename of the image.
         """
-        if self.time is None:
+        t = self.time
+        if t is None:
             # Use the filename as fallback if time is not available
             return self.stem
 
-        data = {"time": self.time.strftime("%Y%m%d_%H%M%S"), "path": str(self)}
+        # Same "%Y%m%d_%H%M%S" layout as strftime, without parsing the format
+        time = (
+            f"{t.year:04d}{t.month:02d}{t.day:02d}_"
+            f"{t.hour:02d}{t.minute:02d}{t.second:02d}"
+        )
+        data = {"time": time, "path": str(self)}
         json_bytes = json.dumps(data).encode("utf-8")
         compressed = gzip.compress(json_bytes)
         return b64encode(compressed).decode("utf-8")
@@ -80,12 +321,34 @@ class Photo(Path):
             compressed_bytes = b64decode(compressed_filename)
             decompressed = gzip.decompress(compressed_bytes)
             data = json.loads(decompressed.decode("utf-8"))
-            return datetime.strptime(data["time"], "%Y%m%d_%H%M%S").replace(
-                tzinfo=local_timezone
-            ), Path(data["path"])
+            match = _COMPRESSED_TIME.fullmatch(data["time"])
+            if match is None:
+                raise ValueError(f"invalid time {data['time']!r}")
+            return datetime(*map(int, match.groups()), tzinfo=local_timezone), Path(
+                data["path"]
+            )
         except Exception as e:
             raise ValueError(f"Invalid compressed filename: {e}")
 
+    def _open_image(self) -> Image.Image:
+        """
+        Open the image for thumbnailing.
+        For RAW files the JPEG preview embedded in the EXIF data is used when
+        available, which avoids decoding (or failing to decode) the RAW data.
+
+        Raises:
+            OSError: If the image cannot be opened.
+        """
+        if self.suffix.lower() in RAW_EXTENSIONS:
+            with open(self, "rb") as f:
+                try:
+                    preview = _raw_preview(f, exifread.process_file(f))
+                except (ExifNotFound, InvalidExif):
+                    preview = None
+            if preview:
+                return Image.open(BytesIO(preview))
+        return Image.open(self)
+
     def thumbnail_exists(self, path: Path) -> bool:
         """
         Check if the thumbnail exists.
@@ -96,8 +359,40 @@ class Photo(Path):
         Returns:
             bool: True if the thumbnail exists, False otherwise.
         """
+        return self._thumb_path(path).exists()
+
+    def _thumb_path(self, path: Path) -> Path:
+        """
+        Return the path of the thumbnail of the image in the given folder.
+        """
         # Use a simpler filename format to avoid path length issues
-        return (path / f"{self.stem}.thumb.jpg").exists()
+        return path / f"{self.stem}.thumb.jpg"
+
+    def thumbnail_up_to_date(self, path: Path) -> bool:
+        """
+        Check if the thumbnail exists and is not older than the image.
+
+        Args:
+            path: Path where the thumbnail will be saved.
+
+        Returns:
+            bool: True if the thumbnail can be reused, False otherwise.
+        """
+        return self._thumb_fresh(self._thumb_path(path))
+
+    def _thumb_fresh(self, thumbnail_path: Path) -> bool:
+        """
+        Check if the given thumbnail exists and is not older than the image.
+        """
+        try:
+            thumbnail_mtime = os.stat(thumbnail_path).st_mtime
+        except FileNotFoundError:
+            return False
+        try:
+            return thumbnail_mtime >= self._cached_stat().st_mtime
+        except OSError:
+            # Nothing to regenerate the thumbnail from
+            return True
 
     def create_thumbnail(self, path: Path, overwrite: bool = False) -> Path | None:
         """
@@ -105,25 +400,29 @@ class Photo(Path):
 
         Args:
             path: Path where the thumbnail will be saved.
-            overwrite: Whether to overwrite the thumbnail if it already exists.
+            overwrite: Whether to overwrite the thumbnail if it is up to date.
 
         Returns:
             Path: Path to the thumbnail or None if the thumbnail could not be created.
         """
-        # Use a simpler filename format to avoid path length issues
-        thumbnail_path = path / f"{self.stem}.thumb.jpg"
+        thumbnail_path = self._thumb_path(path)
 
-        if thumbnail_path.exists() and not overwrite:
+        if not overwrite and self._thumb_fresh(thumbnail_path):
             return thumbnail_path
 
         try:
             # Ensure the parent directory exists
             path.mkdir(parents=True, exist_ok=True)
 
-            with Image.open(self) as im:
-                im.thumbnail((256, 256))
+            with self._open_image() as im:
+                # Let libjpeg decode at a reduced DCT scale (1/2 to 1/8), most of
+                # the full resolution pixels would be thrown away anyway
+                im.draft("RGB", (512, 512))
+                im.thumbnail((256, 256), Image.Resampling.BILINEAR)
+                # JPEG cannot store palette or alpha modes, e.g. from PNGs
+                thumbnail = im if im.mode in ("RGB", "L") else im.convert("RGB")
                 # TODO: Avoid filename collisions
-                im.save(thumbnail_path, "JPEG")
+                thumbnail.save(thumbnail_path, "JPEG")
                 logger.info("Created thumbnail %s", thumbnail_path)
                 return thumbnail_path
         except OSError as e:
@@ -131,21 +430,34 @@ class Photo(Path):
             return None
 
 
+def _create_thumbnail(job: tuple[str, str, bool]) -> Path | None:
+    """
+    Create the thumbnail of a photo, worker of `PhotoCollection.create_thumbnails`.
+
+    Args:
+        job: Tuple with the photo path, thumbnails folder and overwrite flag.
+    """
+    photo_path, path, overwrite = job
+    return Photo(photo_path).create_thumbnail(Path(path), overwrite)
+
+
 class PhotoCollection(FileCollection[Photo]):
     # TODO: Make configurable
-    IMG_EXTENSIONS = [
-        ".bmp",
-        ".gif",
-        ".heic",
-        ".heif",
-        ".jpeg",
-        ".jpg",
-        ".nef",
-        ".png",
-        ".raw",
-        ".tiff",
-        ".webp",
-    ]
+    IMG_EXTENSIONS = frozenset(
+        [
+            ".bmp",
+            ".gif",
+            ".heic",
+            ".heif",
+            ".jpeg",
+            ".jpg",
+            ".nef",
+            ".png",
+            ".raw",
+            ".tiff",
+            ".webp",
+        ]
+    )
 
     def __init__(
         self, path: Path = Path("."), followlinks: bool = False, relative: bool = True
@@ -163,27 +475,100 @@ class PhotoCollection(FileCollection[Photo]):
         """
         return Photo
 
+    def _create(self, path: str) -> Photo | None:
+        photo = super()._create(path)
+        if photo is not None:
+            photo._entry = self._entries[path]
+        return photo
+
+    def prefetch(self) -> None:
+        """
+        Read the time of every photo not read yet in a single batch, instead of
+        one by one as `Photo.time` is accessed.
+        """
+        missing: dict[str, Photo] = {}
+        for photo in self:
+            key = _time_key(photo)
+            if key is not None and key not in _times:
+                missing[key] = photo
+        if not missing:
+            return
+        times = _time_cache.get_many(list(missing.values()), _parse_times)
+        _times.update(zip(missing, times))
+
+    def create_thumbnails(
+        self, path: Path, overwrite: bool = False
+    ) -> dict[Photo, Path | None]:
+        """
+        Create the thumbnails of all the photos in parallel worker processes.
+
+        Args:
+            path: Path where the thumbnails will be saved.
+            overwrite: Whether to overwrite the thumbnails that are up to date.
+
+        Returns:
+            dict[Photo, Path | None]: Path to the thumbnail of each photo, or
+            None if it could not be created.
+        """
+        photos = list(self)
+        thumbnails: dict[Photo, Path | None] = {}
+        pending: dict[Photo, Path] = {}
+        for photo in photos:
+            thumbnail_path = photo._thumb_path(path)
+            if not overwrite and photo._thumb_fresh(thumbnail_path):
+                thumbnails[photo] = thumbnail_path
+            else:
+                pending[photo] = thumbnail_path
+
+        # Photos with the same stem in different folders share a thumbnail
+        # path (see the TODO in create_thumbnail). Only the last one is
+        # written, as when creating them one by one, so no two workers write
+        # the same file at once.
+        writers = {thumbnail_path: photo for photo, thumbnail_path in pending.items()}
+        if writers:
+            jobs = [(str(photo), str(path), overwrite) for photo in writers.values()]
+            with ProcessPoolExecutor() as executor:
+                results = executor.map(_create_thumbnail, jobs, chunksize=16)
+                created = dict(zip(writers, results))
+            for photo, thumbnail_path in pending.items():
+                thumbnails[photo] = created[thumbnail_path]
+        return {photo: thumbnails[photo] for photo in photos}
+
+    def iter_with_time(self) -> Generator[tuple[datetime, Photo], None, None]:
+        """
+        Iterator of (time, photo) pairs, skipping photos without a valid time.
+        The times are prefetched so the files are parsed in parallel.
+        """
+        self.prefetch()
+        for photo in self:
+            time = photo.time
+            if time is not None:
+                yield time, photo
+
     @property
     def sorted_photos(self) -> list[Photo]:
         """
         List of photos sorted by time, excluding photos without a valid time.
         """
-        return sorted(
-            filter(lambda photo: photo.time is not None, self),
-            key=lambda photo: photo.time,  # type: ignore
-        )
+        timed = sorted(self.iter_with_time(), key=itemgetter(0))
+        return [photo for _, photo in timed]
 
     @property
     def df(self) -> pd.DataFrame:
-        data = ((p.resolve() if not self.relative else str(p), p.time) for p in self)
-        # Use a dict to create the DataFrame with properly typed columns
-        df = pd.DataFrame(data=[(src, t) for src, t in data], columns=["photo_src", "time"])  # type: ignore
-        return df.sort_values("time")
+        photos = list(self)
+        srcs = [str(p) if self.relative else str(p.resolve()) for p in photos]
+        self.prefetch()
+        times = pd.to_datetime([p.time for p in photos], utc=True).as_unit("ns")
+        df = pd.DataFrame({"photo_src": srcs, "time": times})
+        df.sort_values("time", inplace=True)
+        return df
 
     @property
     def df_with_time(self) -> pd.DataFrame:
-        return self.df[self.df["time"].notna()]  # type: ignore
+        df = self.df
+        return df[df["time"].notna()]  # type: ignore
 
     @property
     def df_without_time(self) -> pd.DataFrame:
-        return self.df[self.df["time"].isna()]  # type: ignore
+        df = self.df
+        return df[df["time"].isna()]  # type: ignore
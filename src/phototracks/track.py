@@ -1,32 +1,83 @@
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 from functools import cached_property
 from pathlib import Path
+from xml.etree import ElementTree
 from zoneinfo import ZoneInfo
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
+import shapely
 
+from phototracks.cache import FileCache
 from phototracks.collection import FileCollection
 
 local_timezone = ZoneInfo("Europe/Madrid")
 logger = logging.getLogger(__name__)
 
 
+def _local_name(tag: str) -> str:
+    """
+    Return the tag name without its XML namespace, e.g. "trkpt".
+    """
+    return tag.rpartition("}")[2]
+
+
+def _read_track_points(path: Path) -> gpd.GeoDataFrame:
+    """
+    Read the timestamped track points of a GPX file.
+    The file is streamed with ElementTree.iterparse, collecting the point
+    coordinates and times into lists that are converted in bulk.
+
+    Args:
+        path: Path of the GPX file.
+
+    Returns:
+        gpd.GeoDataFrame: The track points with "time" and "geometry" columns.
+
+    Raises:
+        ValueError: If the file has no track points.
+        xml.etree.ElementTree.ParseError: If the file is not valid XML.
+    """
+    lats: list[str | None] = []
+    lons: list[str | None] = []
+    times: list[str | None] = []
+    for _, element in ElementTree.iterparse(path, events=("end",)):
+        if _local_name(element.tag) != "trkpt":
+            continue
+        lats.append(element.get("lat"))
+        lons.append(element.get("lon"))
+        times.append(
+            next(
+                (child.text for child in element if _local_name(child.tag) == "time"),
+                None,
+            )
+        )
+        element.clear()
+
+    if not lats:
+        raise ValueError(f"No track points found in {path}")
+
+    geometry = shapely.points(
+        np.asarray(lons, dtype=float), np.asarray(lats, dtype=float)
+    )
+    return gpd.GeoDataFrame(
+        {"time": pd.to_datetime(times, utc=True, format="ISO8601").as_unit("ns")},
+        geometry=geometry,
+        crs="EPSG:4326",
+    )
+
+
+# Parsed track points persist between runs, keyed by (version, path, mtime, size)
+_points_cache: FileCache[gpd.GeoDataFrame] = FileCache("track_points")
+
+
 class Track(Path):
     def __init__(self, path: Path):
         super().__init__(path)
         try:
-            # Use the proper approach for selecting columns in geopandas
-            self.gdf = gpd.read_file(path, layer="track_points")
-            if self.gdf.empty:
-                raise ValueError(f"No track points found in {path}")
-            # Filter to only keep the time column after reading
-            if "time" in self.gdf.columns:
-                self.gdf = self.gdf[["time", "geometry"]]
-                self.gdf["time"] = pd.to_datetime(self.gdf["time"])
-            else:
-                raise ValueError(f"No time column found in {path}")
+            self.gdf = _points_cache.get(self, _read_track_points)
         except Exception as e:
             raise ValueError(f"Cannot read gpx data from {path}") from e
 
@@ -38,28 +89,22 @@ class Track(Path):
         Returns:
             tuple[datetime, datetime]: The time range of the track.
         """
-        # Filter out any rows with null time values
-        # Convert to pandas Series first to ensure notna is available
-        time_series = pd.Series(self.gdf["time"])
-        valid_times = self.gdf[time_series.notna()]["time"]
+        # Work on the raw datetime64 buffer so min/max run in a single C pass
+        times = self.gdf["time"].to_numpy(dtype="datetime64[ns]")
+        times = times[~np.isnat(times)]
 
-        if len(valid_times) == 0:
+        if len(times) == 0:
             raise ValueError("No valid time data found in track points")
 
-        # Get min and max timestamps and explicitly convert to Python datetime objects
-        min_time_pd = valid_times.min()
-        max_time_pd = valid_times.max()
+        # Only the two resulting scalars are converted to Python datetimes
+        min_time: datetime = times.min().astype("datetime64[us]").item()
+        max_time: datetime = times.max().astype("datetime64[us]").item()
 
-        # Convert pandas Timestamp to Python datetime
-        min_time = datetime.fromtimestamp(
-            min_time_pd.timestamp(), tz=min_time_pd.tzinfo
-        )
-        max_time = datetime.fromtimestamp(
-            max_time_pd.timestamp(), tz=max_time_pd.tzinfo
+        return (
+            min_time.replace(tzinfo=timezone.utc).astimezone(local_timezone),
+            max_time.replace(tzinfo=timezone.utc).astimezone(local_timezone),
         )
 
-        return (min_time, max_time)
-
 
 class TrackCollection(FileCollection[Track]):
 
@@ -95,6 +140,7 @@ class TrackCollection(FileCollection[Track]):
 
     @property
     def gdf_with_time(self) -> gpd.GeoDataFrame:
+        gdf = self.gdf
         return gpd.GeoDataFrame(
-            self.gdf[self.gdf["time"].notna()], geometry="geometry", crs=self.crs
+            gdf[gdf["time"].notna()], geometry="geometry", crs=self.crs
         )
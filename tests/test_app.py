@@ -5,11 +5,12 @@ from unittest.mock import MagicMock
 from zoneinfo import ZoneInfo
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
 import pytest
 from shapely.geometry import Point
 
-from phototracks.app import locate_photos
+from phototracks.app import _nearest, locate_photos
 from phototracks.photo import PhotoCollection
 from phototracks.track import TrackCollection
 
@@ -67,3 +68,90 @@ class TestApp:
 
         assert isinstance(waypoints, gpd.GeoDataFrame)
         assert len(waypoints) == 0
+
+    def test_locate_photos_overlapping_tracks(self):
+        """Test photos inside a track that overlaps a later one are kept."""
+        day = pd.Timestamp("2025-01-26", tz="UTC")
+        # Track A runs 08:00-18:00, track B 09:00-10:00 is nested inside it
+        track_times = {
+            "A": [day + pd.Timedelta(hours=h) for h in (8, 12, 18)],
+            "B": [day + pd.Timedelta(hours=h) for h in (9, 10)],
+        }
+        track_gdf = gpd.GeoDataFrame(
+            {
+                "time": [t for times in track_times.values() for t in times],
+                "track_path": [p for p, ts in track_times.items() for _ in ts],
+            },
+            geometry=[Point(i, i) for i in range(5)],
+            crs="EPSG:4326",
+        ).sort_values("time", ignore_index=True)
+        mock_tracks = MagicMock(spec=TrackCollection)
+        mock_tracks.gdf_with_time = track_gdf
+
+        mock_photos = MagicMock(spec=PhotoCollection)
+        mock_photos.df_with_time = pd.DataFrame(
+            {
+                "photo_src": ["in_b.jpg", "in_a.jpg", "after.jpg"],
+                "time": [
+                    day + pd.Timedelta(hours=9, minutes=50),
+                    day + pd.Timedelta(hours=17),
+                    day + pd.Timedelta(hours=19),
+                ],
+            }
+        )
+
+        waypoints = locate_photos(mock_tracks, mock_photos)
+
+        assert list(waypoints["photo_src"]) == ["in_b.jpg", "in_a.jpg"]
+        assert list(waypoints["track_path"]) == ["B", "A"]
+        # The 18:00 point of track A is the nearest one to the 17:00 photo
+        assert waypoints.geometry.iloc[1] == Point(2, 2)
+
+    def test_locate_photos_no_track_times(self, photos):
+        """Test locating photos when no track point has a time."""
+        mock_tracks = MagicMock(spec=TrackCollection)
+        mock_tracks.gdf_with_time = gpd.GeoDataFrame(
+            {
+                "time": pd.Series([], dtype="datetime64[ns, UTC]"),
+                "track_path": pd.Series([], dtype=str),
+            },
+            geometry=[],
+            crs="EPSG:4326",
+        )
+
+        waypoints = locate_photos(mock_tracks, photos)
+
+        assert isinstance(waypoints, gpd.GeoDataFrame)
+        assert len(waypoints) == 0
+
+
+class TestNearest:
+    @staticmethod
+    def times(*minutes):
+        return np.array(minutes, dtype="timedelta64[m]") + np.datetime64(
+            "2025-01-26T00:00", "ns"
+        )
+
+    def test_nearest_neighbour(self):
+        """Test the closest of the two surrounding times is chosen"""
+        times = self.times(0, 10, 20)
+        assert list(_nearest(times, self.times(2, 8, 12, 19))) == [0, 1, 1, 2]
+
+    def test_nearest_tie(self):
+        """Test ties between two times go to the earlier one"""
+        times = self.times(0, 10, 20)
+        assert list(_nearest(times, self.times(5, 15))) == [0, 1]
+
+    def test_nearest_first_and_last(self):
+        """Test targets outside the times match the first or last one"""
+        times = self.times(0, 10, 20)
+        assert list(_nearest(times, self.times(-5, 0, 20, 25))) == [0, 0, 2, 2]
+
+    def test_nearest_single_time(self):
+        """Test every target matches the only time available"""
+        times = self.times(10)
+        assert list(_nearest(times, self.times(0, 10, 30))) == [0, 0, 0]
+
+    def test_nearest_no_targets(self):
+        """Test an empty array is returned when there are no targets"""
+        assert len(_nearest(self.times(0, 10), self.times())) == 0
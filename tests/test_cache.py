@@ -0,0 +1,118 @@
+import os
+
+import pytest
+
+from phototracks.cache import FileCache, cache_dir
+
+
+class TestFileCache:
+    @pytest.fixture
+    def cache(self):
+        cache = FileCache("test_cache")
+        yield cache
+        cache.close()
+
+    def test_cache_dir_env(self, tmp_path, monkeypatch):
+        """Test the cache folder can be set from the environment"""
+        monkeypatch.setenv("PHOTOTRACKS_CACHE_DIR", str(tmp_path))
+        assert cache_dir() == tmp_path
+
+    def test_get(self, cache, tmp_path):
+        """Test values are computed once and then served from the cache"""
+        path = tmp_path / "file.txt"
+        path.write_text("content")
+        calls = []
+
+        def compute(p):
+            calls.append(p)
+            return p.read_text()
+
+        assert cache.get(path, compute) == "content"
+        assert cache.get(path, compute) == "content"
+        assert len(calls) == 1
+
+    def test_get_persistent(self, cache, tmp_path):
+        """Test values survive closing the cache"""
+        path = tmp_path / "file.txt"
+        path.write_text("content")
+
+        cache.get(path, lambda p: None)
+        cache.close()
+
+        assert cache.get(path, lambda p: "recomputed") is None
+
+    def test_get_invalidated_on_change(self, cache, tmp_path):
+        """Test entries are discarded when the file changes"""
+        path = tmp_path / "file.txt"
+        path.write_text("old")
+        assert cache.get(path, lambda p: p.read_text()) == "old"
+
+        path.write_text("new content")
+        os.utime(path, ns=(0, 0))
+        assert cache.get(path, lambda p: p.read_text()) == "new content"
+
+    def test_get_missing_file(self, cache, tmp_path):
+        """Test missing files are computed without caching"""
+        path = tmp_path / "missing.txt"
+        assert cache.get(path, lambda p: "value") == "value"
+
+    def test_get_many(self, cache, tmp_path):
+        """Test only the misses are computed, in a single call"""
+        paths = [tmp_path / f"file{i}.txt" for i in range(3)]
+        for path in paths:
+            path.write_text(path.name)
+        cache.get(paths[1], lambda p: "cached")
+        calls = []
+
+        def compute(ps):
+            calls.append(ps)
+            return [p.read_text() for p in ps]
+
+        values = cache.get_many(paths, compute)
+
+        assert values == ["file0.txt", "cached", "file2.txt"]
+        assert calls == [[paths[0], paths[2]]]
+
+    def test_get_unreadable_entry(self, cache, tmp_path):
+        """Test unreadable entries are discarded and computed again"""
+        path = tmp_path / "file.txt"
+        path.write_text("content")
+        cache.get(path, lambda p: "cached")
+
+        db = cache._open()
+        assert db is not None
+        key = cache.key(path).encode()
+        db.dict[key] = db.dict[key][:-2]  # type: ignore[attr-defined]
+
+        assert cache.get(path, lambda p: "recomputed") == "recomputed"
+        assert cache.get(path, lambda p: "again") == "recomputed"
+        assert cache.get_many([path], lambda ps: ["many"]) == ["recomputed"]
+
+    def test_get_version(self, cache, tmp_path):
+        """Test entries of another format version are not served"""
+        path = tmp_path / "file.txt"
+        path.write_text("content")
+        cache.get(path, lambda p: "old")
+        cache.close()
+
+        new_cache = FileCache("test_cache", version=2)
+        try:
+            assert new_cache.get(path, lambda p: "new") == "new"
+        finally:
+            new_cache.close()
+
+    def test_key_cached_stat(self, cache, tmp_path):
+        """Test the key reuses the stat a path already has"""
+        path = tmp_path / "file.txt"
+        path.write_text("content")
+        stat = os.stat(path)
+
+        class ScannedPath(type(path)):
+            def _cached_stat(self):
+                return stat
+
+        scanned = ScannedPath(path)
+        path.write_text("changed content")
+
+        assert cache.key(scanned) == f"1:{path}:{stat.st_mtime_ns}:{stat.st_size}"
+        assert cache.key(scanned) != cache.key(path)
@@ -48,6 +48,13 @@ class TestFileCollection:
         assert collection_with_list_filter.path == temp_dir
         assert collection_with_list_filter.filter_extensions == [".jpg", ".png"]
 
+        collection_mixed_case = TestPathCollection(temp_dir, [".JPG", ".Png"])
+        assert collection_mixed_case._extensions == frozenset([".jpg", ".png"])
+
+        collection_set_filter = TestPathCollection(temp_dir, frozenset([".jpg"]))
+        assert collection_set_filter.filter_extensions == frozenset([".jpg"])
+        assert collection_set_filter._extensions == frozenset([".jpg"])
+
     def test_files_no_filter(self, temp_dir):
         """Test files property with no extension filter"""
         collection = TestPathCollection(temp_dir)
@@ -98,3 +105,16 @@ class TestFileCollection:
         assert "file4.png" in filenames
         assert "subfile1.txt" not in filenames
         assert "subfile2.jpg" in filenames
+
+    def test_files_symlinked_dir(self, temp_dir):
+        """Test symlinked folders are only followed with followlinks"""
+        with tempfile.TemporaryDirectory() as other_dir:
+            (Path(other_dir) / "linked.jpg").write_text("linked image")
+            (temp_dir / "link").symlink_to(other_dir, target_is_directory=True)
+
+            filenames = [f.name for f in TestPathCollection(temp_dir, ".jpg")]
+            assert "linked.jpg" not in filenames
+
+            collection = TestPathCollection(temp_dir, ".jpg", followlinks=True)
+            filenames = [f.name for f in collection]
+            assert "linked.jpg" in filenames
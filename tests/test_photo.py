@@ -1,12 +1,27 @@
+import os
 import shutil
+import struct
+import sys
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from io import BytesIO
 from pathlib import Path
 
 import pytest
 from PIL import Image
 
-from phototracks.photo import Photo, PhotoCollection, local_timezone
+from phototracks.photo import (
+    Photo,
+    PhotoCollection,
+    _exiftool_times,
+    _parse_time,
+    _parse_times,
+    _time_cache,
+    _time_key,
+    _times,
+    local_timezone,
+)
 
 
 class TestPhoto:
@@ -44,6 +59,28 @@ class TestPhoto:
         # This is a basic check that we got some reasonable date
         assert time.year >= 2020  # Assuming test photos are recent
 
+    def test_time_from_exif_tag(self, temp_dir):
+        """Test that the EXIF DateTime tag takes precedence over the filename"""
+        photo_path = temp_dir / "250126_1317_exif.jpg"
+        exif = Image.Exif()
+        exif[0x0132] = "2024:05:06 07:08:09"  # DateTime
+        Image.new("RGB", (16, 16)).save(photo_path, exif=exif)
+
+        photo = Photo(photo_path)
+
+        assert photo.time == datetime(2024, 5, 6, 7, 8, 9, tzinfo=local_timezone)
+
+    def test_time_from_unset_exif_tag(self, temp_dir):
+        """Test an unset EXIF DateTime falls back to the filename"""
+        photo_path = temp_dir / "250126_1317_exif.jpg"
+        exif = Image.Exif()
+        exif[0x0132] = "0000:00:00 00:00:00"  # DateTime
+        Image.new("RGB", (16, 16)).save(photo_path, exif=exif)
+
+        photo = Photo(photo_path)
+
+        assert photo.time == datetime(2025, 1, 26, 13, 17, tzinfo=local_timezone)
+
     def test_time_from_filename(self, assets_dir):
         """Test extracting time from filename when EXIF is not available"""
         photo_path = assets_dir / "250126_1317_DSC_2312_no_exif.jpg"
@@ -59,6 +96,43 @@ class TestPhoto:
         assert time.minute == 17
         assert time.tzinfo == local_timezone
 
+    def test_time_from_filename_partial_timestamp(self, temp_dir):
+        """Test filenames without the full %y%m%d_%H%M prefix have no time"""
+        for name in ["25012_1317.jpg", "250126_131.jpg", "250132_1317.jpg"]:
+            photo_path = temp_dir / name
+            photo_path.write_text("This is not an image file")
+
+            assert Photo(photo_path).time is None
+
+    def test_time_shared_between_instances(self, assets_dir):
+        """Test the time is parsed once per file, not once per Photo"""
+        photo_path = assets_dir / "250126_1335_DSC_2323.jpg"
+
+        assert Photo(photo_path).time is Photo(photo_path.resolve()).time
+
+    def test_time_reread_after_edit(self, temp_dir):
+        """Test the time is parsed again once the file changes"""
+        photo_path = temp_dir / "edited.jpg"
+        exif = Image.Exif()
+        exif[0x0132] = "2024:05:06 07:08:09"  # DateTime
+        Image.new("RGB", (16, 16)).save(photo_path, exif=exif)
+        assert Photo(photo_path).time == datetime(
+            2024, 5, 6, 7, 8, 9, tzinfo=local_timezone
+        )
+
+        exif[0x0132] = "2025:01:02 03:04:05"
+        Image.new("RGB", (16, 16)).save(photo_path, exif=exif)
+        mtime_ns = photo_path.stat().st_mtime_ns + 1_000_000_000
+        os.utime(photo_path, ns=(mtime_ns, mtime_ns))
+
+        assert Photo(photo_path).time == datetime(
+            2025, 1, 2, 3, 4, 5, tzinfo=local_timezone
+        )
+        collection = PhotoCollection(temp_dir)
+        assert [photo.time for photo in collection] == [
+            datetime(2025, 1, 2, 3, 4, 5, tzinfo=local_timezone)
+        ]
+
     def test_time_invalid_filename_and_no_exif(self, assets_dir):
         """Test error when both filename and EXIF data are invalid"""
         photo_path = assets_dir / "no_date.png"
@@ -103,6 +177,7 @@ class TestPhoto:
 
         # Check that the decoded values match the original
         assert isinstance(time, datetime)
+        assert time == photo.time
         assert path == photo
 
     def test_from_compressed_filename_invalid(self):
@@ -146,6 +221,70 @@ class TestPhoto:
             assert width <= 256
             assert height <= 256
 
+    def test_create_thumbnail_raw_preview(self, temp_dir):
+        """Test RAW thumbnails are created from the embedded JPEG preview"""
+        buffer = BytesIO()
+        Image.new("RGB", (320, 240), "red").save(buffer, "JPEG")
+        preview = buffer.getvalue()
+
+        # Minimal little-endian TIFF: IFD0 with ImageWidth, IFD1 pointing to
+        # the JPEG preview through JPEGInterchangeFormat(Length).
+        raw_path = temp_dir / "preview.nef"
+        raw_path.write_bytes(
+            b"II*\x00"
+            + struct.pack("<I", 8)
+            + struct.pack("<H", 1)
+            + struct.pack("<HHII", 0x0100, 4, 1, 320)
+            + struct.pack("<I", 26)
+            + struct.pack("<H", 2)
+            + struct.pack("<HHII", 0x0201, 4, 1, 56)
+            + struct.pack("<HHII", 0x0202, 4, 1, len(preview))
+            + struct.pack("<I", 0)
+            + preview
+        )
+
+        thumbnail_path = Photo(raw_path).create_thumbnail(temp_dir)
+
+        assert thumbnail_path is not None
+        with Image.open(thumbnail_path) as img:
+            assert img.size == (256, 192)
+
+    def test_create_thumbnail_nef_subifd_preview(self, temp_dir):
+        """Test NEF thumbnails use the large preview stored in a SubIFD"""
+        previews = []
+        for size in [(80, 60), (640, 480)]:
+            buffer = BytesIO()
+            Image.new("RGB", size, "red").save(buffer, "JPEG")
+            previews.append(buffer.getvalue())
+        small, large = previews
+
+        # NEF layout: IFD0 links the full size preview through SubIFDs, IFD1
+        # holds a smaller thumbnail. Each IFD has 2 entries, i.e. 30 bytes.
+        def ifd(entries, next_ifd=0):
+            return (
+                struct.pack("<H", len(entries))
+                + b"".join(struct.pack("<HHII", *entry) for entry in entries)
+                + struct.pack("<I", next_ifd)
+            )
+
+        subifd, ifd1, data = 38, 68, 98
+        raw_path = temp_dir / "preview.nef"
+        raw_path.write_bytes(
+            b"II*\x00"
+            + struct.pack("<I", 8)
+            + ifd([(0x0100, 4, 1, 4288), (0x014A, 4, 1, subifd)], ifd1)
+            + ifd([(0x0201, 4, 1, data + len(small)), (0x0202, 4, 1, len(large))])
+            + ifd([(0x0201, 4, 1, data), (0x0202, 4, 1, len(small))])
+            + small
+            + large
+        )
+
+        thumbnail_path = Photo(raw_path).create_thumbnail(temp_dir)
+
+        assert thumbnail_path is not None
+        with Image.open(thumbnail_path) as img:
+            assert img.size == (256, 192)
+
     def test_create_thumbnail_no_overwrite(self, assets_dir, temp_dir):
         """Test thumbnail creation with no overwrite"""
         photo_path = assets_dir / "250126_1335_DSC_2323.jpg"
@@ -204,6 +343,24 @@ class TestPhoto:
         assert second_thumbnail is not None
         assert second_thumbnail.stat().st_mtime > first_mtime
 
+    def test_create_thumbnail_outdated(self, assets_dir, temp_dir):
+        """Test thumbnails older than the image are recreated"""
+        photo_path = temp_dir / "250126_1335_DSC_2323.jpg"
+        shutil.copy(assets_dir / photo_path.name, photo_path)
+        photo = Photo(photo_path)
+
+        thumbnail = photo.create_thumbnail(temp_dir)
+        assert thumbnail is not None
+        assert photo.thumbnail_up_to_date(temp_dir)
+
+        # Make the thumbnail older than the image
+        os.utime(thumbnail, (0, 0))
+        assert not photo.thumbnail_up_to_date(temp_dir)
+
+        assert photo.create_thumbnail(temp_dir) == thumbnail
+        assert thumbnail.stat().st_mtime > 0
+        assert photo.thumbnail_up_to_date(temp_dir)
+
     def test_create_thumbnail_error(self, temp_dir):
         """Test thumbnail creation with invalid image"""
         # Create an invalid image file
@@ -301,3 +458,194 @@ class TestPhotoCollection:
             if prev_time is not None and curr_time is not None:
                 assert prev_time <= curr_time
             # If either is None, we can't compare them, so we'll skip the assertion
+
+    def test_iter_with_time(self, temp_collection_dir):
+        """Test iter_with_time yields the time of every photo that has one"""
+        collection = PhotoCollection(temp_collection_dir)
+        timed = list(collection.iter_with_time())
+
+        assert timed
+        assert [photo for _, photo in timed] == [
+            photo for photo in collection if photo.time is not None
+        ]
+        for time, photo in timed:
+            assert time == photo.time
+
+    def test_prefetch(self, temp_collection_dir, monkeypatch):
+        """Test prefetch reads the same times as Photo.time"""
+        collection = PhotoCollection(temp_collection_dir)
+        expected = {photo: _parse_time(photo) for photo in collection}
+        collection.prefetch()
+
+        # Every time is already read, none is parsed lazily
+        monkeypatch.setattr("phototracks.photo._parse_time", None)
+        for photo in collection:
+            assert _time_key(photo) in _times
+            assert photo.time == expected[photo]
+
+    def test_parse_times_without_pool(self, temp_collection_dir, monkeypatch):
+        """Test times are parsed in-process when no worker can be started"""
+
+        def no_pool(*args, **kwargs):
+            raise OSError("no /dev/shm")
+
+        monkeypatch.setenv("PATH", str(temp_collection_dir / "missing"))
+        monkeypatch.setattr("phototracks.photo._PARALLEL_MIN_FILES", 1)
+        monkeypatch.setattr("phototracks.photo.ProcessPoolExecutor", no_pool)
+        paths = sorted(temp_collection_dir.glob("*.jpg"))
+
+        assert _parse_times(paths) == [_parse_time(path) for path in paths]
+
+    def test_stat_reuses_scan(self, temp_collection_dir):
+        """Test photos reuse the stat of the folder scan"""
+        collection = PhotoCollection(temp_collection_dir)
+
+        for photo in collection:
+            assert photo._cached_stat() is photo._cached_stat()
+            assert photo._cached_stat().st_size == os.stat(photo).st_size
+
+    def test_exists_after_remove(self, temp_collection_dir):
+        """Test Path methods are not answered from the scan once a file is gone"""
+        collection = PhotoCollection(temp_collection_dir)
+        photo = next(iter(collection))
+        photo._cached_stat()
+
+        os.remove(photo)
+
+        assert not photo.exists()
+        assert not photo.is_file()
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="needs a shebang script")
+    def test_exiftool_times(self, temp_collection_dir, monkeypatch):
+        """Test times are read from a single exiftool -json call"""
+        bin_dir = temp_collection_dir / "bin"
+        bin_dir.mkdir()
+        exiftool = bin_dir / "exiftool"
+        # Fake exiftool reporting a ModifyDate for the "exif" files only
+        exiftool.write_text(
+            f"#!{sys.executable}\n"
+            "import json, sys\n"
+            "paths = sys.stdin.read().splitlines()\n"
+            "print(json.dumps([\n"
+            "    {'SourceFile': p, 'ModifyDate': '2024:05:06 07:08:09'}\n"
+            "    if 'exif' in p else {'SourceFile': p} for p in paths\n"
+            "]))\n"
+        )
+        exiftool.chmod(0o755)
+        monkeypatch.setenv("PATH", str(bin_dir))
+
+        paths = [
+            temp_collection_dir / "250126_1317_DSC_2312_no_exif.jpg",
+            temp_collection_dir / "250126_1400_photo.jpg",
+            temp_collection_dir / "no_date.png",
+        ]
+        times = _exiftool_times(paths)
+
+        assert times == [
+            datetime(2024, 5, 6, 7, 8, 9, tzinfo=local_timezone),
+            datetime(2025, 1, 26, 14, 0, tzinfo=local_timezone),
+            None,
+        ]
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="needs a shebang script")
+    @pytest.mark.parametrize(
+        "script",
+        [
+            # Broken install: fails without any output
+            "sys.exit(2)\n",
+            # Only reports the first file
+            "import json\n"
+            "print(json.dumps([{'SourceFile': sys.stdin.readline().strip()}]))\n",
+        ],
+    )
+    def test_exiftool_times_failure(self, tmp_path, monkeypatch, script):
+        """Test exifread is used when exiftool does not report every file"""
+        photo_path = tmp_path / "250126_1317_exif.jpg"
+        exif = Image.Exif()
+        exif[0x0132] = "2024:05:06 07:08:09"  # DateTime
+        Image.new("RGB", (16, 16)).save(photo_path, exif=exif)
+        (tmp_path / "250126_1400_other.jpg").write_text("This is not an image")
+
+        bin_dir = tmp_path / "bin"
+        bin_dir.mkdir()
+        exiftool = bin_dir / "exiftool"
+        exiftool.write_text(f"#!{sys.executable}\nimport sys\n{script}")
+        exiftool.chmod(0o755)
+        monkeypatch.setenv("PATH", str(bin_dir))
+
+        paths = sorted(tmp_path.glob("*.jpg"))
+        assert _exiftool_times(paths) is None
+
+        expected = datetime(2024, 5, 6, 7, 8, 9, tzinfo=local_timezone)
+        collection = PhotoCollection(tmp_path)
+        collection.prefetch()
+        assert Photo(photo_path).time == expected
+
+        # The persistent cache holds the exifread time too
+        _times.clear()
+        assert _time_cache.get(photo_path, lambda p: None) == expected
+
+    def test_exiftool_times_not_installed(self, temp_collection_dir, monkeypatch):
+        """Test None is returned when exiftool is not available"""
+        monkeypatch.setenv("PATH", str(temp_collection_dir / "missing"))
+
+        assert _exiftool_times([temp_collection_dir / "no_date.png"]) is None
+
+    def test_df(self, temp_collection_dir):
+        """Test df property"""
+        collection = PhotoCollection(temp_collection_dir)
+        df = collection.df
+
+        assert list(df.columns) == ["photo_src", "time"]
+        assert df["time"].dtype == "datetime64[ns, UTC]"
+        assert len(df) == len(list(collection))
+        # Photos without time (no_date.png) are kept but sorted last
+        assert df["time"].isna().sum() == 1
+        assert df["time"].dropna().is_monotonic_increasing
+
+    def test_create_thumbnails(self, temp_collection_dir):
+        """Test creating the thumbnails of the whole collection"""
+        thumbnails_dir = temp_collection_dir / "thumbnails"
+        collection = PhotoCollection(temp_collection_dir)
+
+        thumbnails = collection.create_thumbnails(thumbnails_dir)
+
+        assert set(thumbnails) == set(collection)
+        for photo, thumbnail_path in thumbnails.items():
+            assert thumbnail_path is not None
+            assert thumbnail_path.exists()
+            assert photo.thumbnail_exists(thumbnails_dir)
+
+        # Existing thumbnails are kept unless overwrite is set
+        mtimes = {p: t.stat().st_mtime_ns for p, t in thumbnails.items() if t}
+        assert collection.create_thumbnails(thumbnails_dir) == thumbnails
+        assert all(
+            t.stat().st_mtime_ns == mtimes[p] for p, t in thumbnails.items() if t
+        )
+
+    def test_create_thumbnails_same_stem(self, assets_dir, tmp_path, monkeypatch):
+        """Test photos sharing a thumbnail path are written by a single job"""
+        source = assets_dir / "250126_1335_DSC_2323.jpg"
+        for folder in ["a", "b"]:
+            (tmp_path / folder).mkdir()
+            shutil.copy(source, tmp_path / folder / source.name)
+        jobs = []
+
+        class Executor(ThreadPoolExecutor):
+            def map(self, fn, *iterables, **kwargs):
+                jobs.extend(iterables[0])
+                return super().map(fn, *iterables)
+
+        monkeypatch.setattr("phototracks.photo.ProcessPoolExecutor", Executor)
+        collection = PhotoCollection(tmp_path)
+
+        thumbnails = collection.create_thumbnails(tmp_path / "thumbnails")
+
+        assert len(jobs) == 1
+        assert jobs[0][0] == str(list(collection)[-1])
+        assert len(thumbnails) == 2
+        assert len(set(thumbnails.values())) == 1
+        thumbnail_path = next(iter(thumbnails.values()))
+        assert thumbnail_path is not None
+        with Image.open(thumbnail_path) as img:
+            img.verify()
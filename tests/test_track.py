@@ -4,6 +4,7 @@ from datetime import datetime
 from pathlib import Path
 
 import geopandas as gpd
+import pandas as pd
 import pytest
 
 from phototracks.track import Track, TrackCollection
@@ -25,6 +26,15 @@ class TestTrack:
         assert not track.gdf.empty
         assert "time" in track.gdf.columns
         assert "geometry" in track.gdf.columns
+        assert track.gdf["time"].dtype == "datetime64[ns, UTC]"
+
+    def test_init_cached(self, sample_gpx_file):
+        """Test a second Track of the same file reads the cached points."""
+        first = Track(sample_gpx_file)
+        second = Track(sample_gpx_file)
+
+        assert first.gdf is not second.gdf
+        assert first.gdf.equals(second.gdf)
 
     def test_init_invalid_file(self, tmp_path):
         """Test Track initialization with an invalid file."""
@@ -34,6 +44,24 @@ class TestTrack:
         with pytest.raises(ValueError, match="Cannot read gpx data"):
             Track(invalid_path)
 
+    def test_init_gpx_1_0(self, tmp_path):
+        """Test reading GPX 1.0 track points, with and without time."""
+        gpx_path = tmp_path / "track.gpx"
+        gpx_path.write_text(
+            '<gpx version="1.0" xmlns="http://www.topografix.com/GPX/1/0">'
+            "<trk><trkseg>"
+            '<trkpt lat="40.5" lon="-3.5"><time>2025-01-26T09:29:05Z</time></trkpt>'
+            '<trkpt lat="40.6" lon="-3.6"><ele>650</ele></trkpt>'
+            "</trkseg></trk></gpx>"
+        )
+
+        track = Track(gpx_path)
+
+        assert list(track.gdf.geometry.x) == [-3.5, -3.6]
+        assert list(track.gdf.geometry.y) == [40.5, 40.6]
+        assert track.gdf["time"].iloc[0] == pd.Timestamp("2025-01-26T09:29:05Z")
+        assert pd.isna(track.gdf["time"].iloc[1])
+
     def test_time_range(self, sample_gpx_file):
         """Test the time_range property."""
         track = Track(sample_gpx_file)